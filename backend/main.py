@@ -2,7 +2,7 @@ from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import tempfile
 import os
-from typing import Optional
+from typing import List, Optional
 
 
 from src.fraud_analyzer import FraudAnalyzerAI
@@ -10,6 +10,8 @@ from src.resume_parser import ResumeParserLLM
 from src.plagiarism_detector import PlagiarismDetector
 from src.education_analyzer import AIEducationValidator
 from src.fraud_reporter import FraudReportGenerator
+from src.jd_matcher import JDMatcher
+from src.embedding_cache import get_embedding_cache
 from exception import ResumeFraudException
 
 from logger import logger
@@ -38,6 +40,12 @@ def root():
     return {"message": "Fraud Detection API Running"}
 
 
+@app.get("/cache/stats")
+def cache_stats():
+    logger.info("Cache stats endpoint accessed.")
+    return get_embedding_cache().stats()
+
+
 @app.post("/analyze")
 async def analyze_resume(file: UploadFile = File(...), jd: Optional[str] = Form(None)):
     try:
@@ -72,4 +80,36 @@ async def analyze_resume(file: UploadFile = File(...), jd: Optional[str] = Form(
 
     except ResumeFraudException as e:
         logger.error(str(e))
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/match")
+async def match_resumes(
+    files: List[UploadFile] = File(...),
+    jds: List[str] = Form(...),
+    top_k: int = Form(5, ge=1),
+):
+    tmp_paths = []
+    try:
+        logger.info(f"Received {len(files)} resumes and {len(jds)} JDs for matching.")
+
+        for file in files:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=file.filename) as tmp:
+                tmp.write(await file.read())
+                tmp_paths.append(tmp.name)
+
+        matcher = JDMatcher()
+        result = matcher.match(
+            tmp_paths, jds, resume_names=[file.filename for file in files], top_k=top_k
+        )
+
+        logger.info("Resume/JD matching completed successfully.")
+        return result
+
+    except ResumeFraudException as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+    finally:
+        for path in tmp_paths:
+            os.remove(path)
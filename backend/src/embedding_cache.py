@@ -0,0 +1,348 @@
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from logger import logger
+from exception import ResumeFraudException
+
+
+DENSE_MODEL = "llama-text-embed-v2"
+SPARSE_MODEL = "pinecone-sparse-english-v0"
+
+# sqlite's default limit on bound parameters per statement
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """On-disk cache of chunk embeddings shared by ingestion and query paths.
+
+    Entries are keyed by a hash of the normalized chunk text, the model name and the
+    input type. Dense vectors live in a memory-mapped float32 array, one slot per entry,
+    with the entry's key digest stored next to each slot and checked on every read.
+    Sparse vectors are kept as compact uint32/float32 blobs. The key -> slot index,
+    sparse blobs, LRU order and hit/miss counters live in sqlite, so several processes
+    (uvicorn workers, the ingestion notebook) can share one cache directory: every
+    write happens inside a single ``BEGIN IMMEDIATE`` transaction per batch. The first
+    process to create the store fixes its capacity; later ones adopt it. Cache failures
+    are logged and never fail the embedding call.
+    """
+
+    def __init__(self, cache_dir: str = "embedding_cache", max_entries: int = 20000):
+        try:
+            self.cache_dir = cache_dir
+            self.max_entries = max_entries
+            os.makedirs(cache_dir, exist_ok=True)
+
+            self._dense_path = os.path.join(cache_dir, "dense.f32")
+            self._slot_keys_path = os.path.join(cache_dir, "dense_keys.u8")
+            self._lock = threading.Lock()
+
+            self._db = sqlite3.connect(
+                os.path.join(cache_dir, "index.sqlite"),
+                timeout=30,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER);
+                CREATE TABLE IF NOT EXISTS dense (
+                    key TEXT PRIMARY KEY, slot INTEGER UNIQUE NOT NULL, last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS dense_lru ON dense (last_used);
+                CREATE TABLE IF NOT EXISTS sparse (
+                    key TEXT PRIMARY KEY, indices BLOB NOT NULL, vals BLOB NOT NULL, last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS sparse_lru ON sparse (last_used);
+                INSERT OR IGNORE INTO meta (name, value) VALUES ('hits', 0), ('misses', 0);
+            """)
+
+            self.dim = None
+            self._dense = None
+            self._slot_keys = None
+            self._dense_inode = None
+            self._attach_dense()
+
+            stats = self.stats()
+            logger.info(
+                f"Embedding cache ready at '{cache_dir}': "
+                f"{stats['dense_entries']} dense, {stats['sparse_entries']} sparse entries."
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to initialize embedding cache: {e}")
+            raise ResumeFraudException("Embedding cache initialization failed.", sys) from e
+
+    @staticmethod
+    def make_key(text: str, model: str, input_type: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model}\x00{input_type}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def _meta(self, name: str):
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name: str, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def _attach_dense(self) -> bool:
+        """Map the dense store if it exists, adopting its capacity; never creates it."""
+        dim, capacity = self._meta("dim"), self._meta("capacity")
+        if not dim:
+            return False
+        if capacity != self.max_entries:
+            logger.warning(
+                f"Embedding cache '{self.cache_dir}' was created with max_entries={capacity}; "
+                f"using that instead of {self.max_entries}."
+            )
+            self.max_entries = capacity
+        try:
+            inode = os.stat(self._dense_path).st_ino
+            if self._dense is not None and inode == self._dense_inode:
+                return True
+            self._dense = np.memmap(self._dense_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+            self._slot_keys = np.memmap(self._slot_keys_path, dtype=np.uint8, mode="r+", shape=(capacity, 32))
+        except (OSError, ValueError):
+            return False
+        self.dim, self._dense_inode = dim, inode
+        return True
+
+    def _create_dense(self, dim: int):
+        """Replace the dense store with an empty one; caller holds the write transaction."""
+        logger.info(f"Creating dense embedding store: {self.max_entries} x {dim}.")
+        # Keys first: a process that maps the new (zeroed) keys file never sees a stale key.
+        for path, dtype, width in ((self._slot_keys_path, np.uint8, 32), (self._dense_path, np.float32, dim)):
+            tmp = np.memmap(path + ".tmp", dtype=dtype, mode="w+", shape=(self.max_entries, width))
+            tmp.flush()
+            del tmp
+            os.replace(path + ".tmp", path)
+
+        self._db.execute("DELETE FROM dense")
+        self._set_meta("dim", dim)
+        self._set_meta("capacity", self.max_entries)
+        self._dense = None
+        if not self._attach_dense():
+            raise OSError(f"Could not map dense embedding store in '{self.cache_dir}'.")
+
+    def _read_dense(self, key: str, slot: int):
+        digest = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+        if not np.array_equal(self._slot_keys[slot], digest):
+            return None
+        vector = np.array(self._dense[slot])
+        # A writer clears the slot key before touching the vector, so re-checking
+        # catches a slot that was reassigned while we were copying it.
+        if not np.array_equal(self._slot_keys[slot], digest):
+            return None
+        return vector
+
+    def _select(self, query: str, keys: List[str]):
+        for start in range(0, len(keys), _SQL_BATCH):
+            batch = keys[start:start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            yield from self._db.execute(query.format(placeholders), batch)
+
+    def _lookup_dense(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if not self._attach_dense():
+            return {}
+        found = {}
+        for key, slot in self._select("SELECT key, slot FROM dense WHERE key IN ({})", list(set(keys))):
+            vector = self._read_dense(key, slot)
+            if vector is not None:
+                found[key] = vector
+        return found
+
+    def _lookup_sparse(self, keys: List[str]) -> Dict[str, Dict]:
+        found = {}
+        query = "SELECT key, indices, vals FROM sparse WHERE key IN ({})"
+        for key, indices, vals in self._select(query, list(set(keys))):
+            found[key] = {
+                'indices': np.frombuffer(indices, dtype=np.uint32).tolist(),
+                'values': np.frombuffer(vals, dtype=np.float32).tolist(),
+            }
+        return found
+
+    def _assign_slots(self, keys: List[str], now: float) -> List[Tuple[str, int]]:
+        """Give each new key a dense slot, evicting least recently used entries when full."""
+        assigned = []
+        count, next_slot = self._db.execute("SELECT COUNT(*), COALESCE(MAX(slot) + 1, 0) FROM dense").fetchone()
+        for key in keys:
+            row = self._db.execute("SELECT slot FROM dense WHERE key = ?", (key,)).fetchone()
+            if row:
+                # Another process stored this key since our lookup; rewrite only a slot whose tag is off.
+                digest = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+                if not np.array_equal(self._slot_keys[row[0]], digest):
+                    assigned.append((key, row[0]))
+                continue
+            if count < self.max_entries:
+                slot = next_slot
+                count, next_slot = count + 1, next_slot + 1
+            else:
+                old_key, slot = self._db.execute(
+                    "SELECT key, slot FROM dense ORDER BY last_used LIMIT 1"
+                ).fetchone()
+                self._db.execute("DELETE FROM dense WHERE key = ?", (old_key,))
+            self._db.execute("INSERT INTO dense (key, slot, last_used) VALUES (?, ?, ?)", (key, slot, now))
+            assigned.append((key, slot))
+        return assigned
+
+    def _write_dense(self, new_dense: Dict[str, np.ndarray], now: float):
+        dim = len(next(iter(new_dense.values())))
+        if not self._attach_dense():
+            self._create_dense(dim)
+        elif dim != self.dim:
+            raise ValueError(f"Dense dimension {dim} does not match cache dimension {self.dim}.")
+
+        assigned = self._assign_slots(list(new_dense), now)
+        if not assigned:
+            return
+
+        # Invalidate, write, then tag each slot, syncing in between, so neither a
+        # crash nor a concurrent reader can pair a key with another key's vector.
+        for _, slot in assigned:
+            self._slot_keys[slot] = 0
+        self._slot_keys.flush()
+        for key, slot in assigned:
+            self._dense[slot] = new_dense[key]
+        self._dense.flush()
+        for key, slot in assigned:
+            self._slot_keys[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+        self._slot_keys.flush()
+
+    def _store(self, new_dense: Dict, new_sparse: Dict, dense_hits: List[str],
+               sparse_hits: List[str], hits: int, misses: int):
+        """Persist one batch (new entries, LRU touches, counters) in a single transaction."""
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if new_dense:
+                self._write_dense(new_dense, now)
+
+            if new_sparse:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sparse (key, indices, vals, last_used) VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            key,
+                            np.asarray(emb['indices'], dtype=np.uint32).tobytes(),
+                            np.asarray(emb['values'], dtype=np.float32).tobytes(),
+                            now,
+                        )
+                        for key, emb in new_sparse.items()
+                    ],
+                )
+                overflow = self._db.execute("SELECT COUNT(*) FROM sparse").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    self._db.execute(
+                        "DELETE FROM sparse WHERE key IN (SELECT key FROM sparse ORDER BY last_used LIMIT ?)",
+                        (overflow,),
+                    )
+
+            self._db.executemany("UPDATE dense SET last_used = ? WHERE key = ?", [(now, k) for k in dense_hits])
+            self._db.executemany("UPDATE sparse SET last_used = ? WHERE key = ?", [(now, k) for k in sparse_hits])
+            self._db.execute("UPDATE meta SET value = value + ? WHERE name = 'hits'", (hits,))
+            self._db.execute("UPDATE meta SET value = value + ? WHERE name = 'misses'", (misses,))
+            self._db.execute("COMMIT")
+        except Exception:
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _embed_missing(pc, model: str, texts: Dict[str, str], input_type: str,
+                       batch_size: int, sparse: bool) -> Dict:
+        embedded = {}
+        keys = list(texts)
+        for start in range(0, len(keys), batch_size):
+            batch_keys = keys[start:start + batch_size]
+            response = pc.inference.embed(
+                model=model,
+                inputs=[texts[key] for key in batch_keys],
+                parameters={"input_type": input_type, "truncate": "END"}
+            )
+            for key, emb in zip(batch_keys, response):
+                embedded[key] = (
+                    {'indices': emb['sparse_indices'], 'values': emb['sparse_values']} if sparse
+                    else np.asarray(emb['values'], dtype=np.float32)
+                )
+        return embedded
+
+    def embed_hybrid(self, pc, texts: List[str], input_type: str, dense_model: str = DENSE_MODEL,
+                     sparse_model: str = SPARSE_MODEL, batch_size: int = 96):
+        """Dense and sparse embeddings for ``texts``, only calling Pinecone for uncached chunks.
+
+        Returns ``(dense, sparse)``: dense vectors stacked into an ``(n, dim)`` float32
+        array and sparse vectors as ``{'indices': [...], 'values': [...]}`` dicts, in the
+        order of ``texts``.
+        """
+        dense_keys = [self.make_key(text, dense_model, input_type) for text in texts]
+        sparse_keys = [self.make_key(text, sparse_model, input_type) for text in texts]
+
+        try:
+            with self._lock:
+                dense_found = self._lookup_dense(dense_keys)
+                sparse_found = self._lookup_sparse(sparse_keys)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed, embedding everything: {e}")
+            dense_found, sparse_found = {}, {}
+
+        dense_missing = {k: t for k, t in zip(dense_keys, texts) if k not in dense_found}
+        sparse_missing = {k: t for k, t in zip(sparse_keys, texts) if k not in sparse_found}
+        misses = len(dense_missing) + len(sparse_missing)
+        if misses:
+            logger.info(f"Embedding cache: {2 * len(texts) - misses}/{2 * len(texts)} hits.")
+
+        new_dense = self._embed_missing(pc, dense_model, dense_missing, input_type, batch_size, sparse=False)
+        new_sparse = self._embed_missing(pc, sparse_model, sparse_missing, input_type, batch_size, sparse=True)
+
+        try:
+            with self._lock:
+                self._store(
+                    new_dense, new_sparse, list(dense_found), list(sparse_found), 2 * len(texts) - misses, misses
+                )
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed, returning uncached embeddings: {e}")
+
+        dense_found.update(new_dense)
+        sparse_found.update(new_sparse)
+        dense = (
+            np.stack([dense_found[k] for k in dense_keys]) if dense_keys
+            else np.empty((0, self.dim or 0), dtype=np.float32)
+        )
+        return dense, [sparse_found[k] for k in sparse_keys]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses = self._meta("hits") or 0, self._meta("misses") or 0
+            dense_entries = self._db.execute("SELECT COUNT(*) FROM dense").fetchone()[0]
+            sparse_entries = self._db.execute("SELECT COUNT(*) FROM sparse").fetchone()[0]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "dense_entries": dense_entries,
+            "sparse_entries": sparse_entries,
+            "max_entries": self.max_entries,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache instance, so every detector shares one connection and mapping."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache(
+                cache_dir=os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.getcwd(), "embedding_cache")),
+                max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000")),
+            )
+    return _default_cache
@@ -0,0 +1,161 @@
+import sys
+import numpy as np
+from scipy import sparse
+from typing import List, Dict, Tuple
+
+from logger import logger
+from exception import ResumeFraudException
+from src.plagiarism_detector import PlagiarismDetector
+
+
+DENSE_WEIGHT = 0.3
+SPARSE_WEIGHT = 0.7
+
+
+class JDMatcher:
+    """Rank many resumes against many JDs with one vectorized hybrid score matrix.
+
+    Uses the same scoring as ``PlagiarismDetector.check_with_jd``: per resume chunk,
+    0.3 * dense cosine + 0.7 * sparse overlap (normalized by the chunk's sparse mass),
+    averaged over the resume's chunks.
+    """
+
+    def __init__(self, detector: PlagiarismDetector = None):
+        self.detector = detector or PlagiarismDetector()
+        logger.info("JDMatcher initialized.")
+
+    @staticmethod
+    def _dense_matrix(dense_embs: List[List[float]]) -> np.ndarray:
+        matrix = np.asarray(dense_embs, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / (norms + 1e-10)
+
+    @staticmethod
+    def _sparse_matrices(*groups: List[Dict]) -> Tuple[sparse.csr_matrix, ...]:
+        """Build CSR matrices for each group over a shared, compacted vocabulary."""
+        all_indices = [np.asarray(s['indices'], dtype=np.int64) for group in groups for s in group]
+        vocab = np.unique(np.concatenate(all_indices)) if all_indices else np.empty(0, dtype=np.int64)
+
+        matrices = []
+        for group in groups:
+            lengths = [len(s['indices']) for s in group]
+            indptr = np.zeros(len(group) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+
+            if group and indptr[-1]:
+                cols = np.searchsorted(vocab, np.concatenate([np.asarray(s['indices'], dtype=np.int64) for s in group]))
+                vals = np.concatenate([np.asarray(s['values'], dtype=np.float32) for s in group])
+            else:
+                cols = np.empty(0, dtype=np.int64)
+                vals = np.empty(0, dtype=np.float32)
+
+            matrix = sparse.csr_matrix((vals, cols, indptr), shape=(len(group), len(vocab)))
+            matrix.sum_duplicates()
+            matrices.append(matrix)
+
+        return tuple(matrices)
+
+    @staticmethod
+    def score_matrix(
+        chunk_dense: List[List[float]],
+        chunk_sparse: List[Dict],
+        chunk_owner: np.ndarray,
+        n_resumes: int,
+        jd_dense: List[List[float]],
+        jd_sparse: List[Dict],
+    ) -> np.ndarray:
+        """Return an (n_resumes x n_jds) matrix of average hybrid chunk scores."""
+        n_jds = len(jd_dense)
+        if not len(chunk_dense) or not n_jds:
+            return np.zeros((n_resumes, n_jds), dtype=np.float32)
+
+        dense_scores = JDMatcher._dense_matrix(chunk_dense) @ JDMatcher._dense_matrix(jd_dense).T
+
+        chunk_csr, jd_csr = JDMatcher._sparse_matrices(chunk_sparse, jd_sparse)
+        chunk_mass = np.asarray(chunk_csr.sum(axis=1)).ravel()
+        sparse_scores = (chunk_csr @ jd_csr.T).toarray() / (chunk_mass[:, None] + 1e-10)
+
+        chunk_scores = DENSE_WEIGHT * dense_scores + SPARSE_WEIGHT * sparse_scores
+
+        # Row-normalized chunk->resume membership matrix turns the sum into a mean.
+        counts = np.bincount(chunk_owner, minlength=n_resumes).astype(np.float32)
+        weights = 1.0 / counts[chunk_owner]
+        membership = sparse.csr_matrix(
+            (weights, (chunk_owner, np.arange(len(chunk_owner)))),
+            shape=(n_resumes, len(chunk_owner)),
+        )
+        return np.asarray(membership @ chunk_scores)
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int, axis: int) -> np.ndarray:
+        """Indices of the k highest scores along ``axis``, sorted descending."""
+        k = min(k, scores.shape[axis])
+        if k <= 0:
+            return np.empty(scores.shape[:axis] + (0,) + scores.shape[axis + 1:], dtype=np.int64)
+
+        part = np.argpartition(-scores, k - 1, axis=axis)
+        part = np.take(part, np.arange(k), axis=axis)
+        order = np.argsort(-np.take_along_axis(scores, part, axis=axis), axis=axis, kind="stable")
+        return np.take_along_axis(part, order, axis=axis)
+
+    def match(
+        self,
+        resume_paths: List[str],
+        jd_texts: List[str],
+        resume_names: List[str] = None,
+        top_k: int = 5,
+        threshold: float = 0.7,
+    ) -> dict:
+        if top_k < 1:
+            raise ValueError(f"top_k must be at least 1, got {top_k}.")
+
+        try:
+            resume_names = resume_names or resume_paths
+            logger.info(f"Matching {len(resume_paths)} resumes against {len(jd_texts)} JDs...")
+
+            chunk_texts, chunk_owner = [], []
+            for owner, path in enumerate(resume_paths):
+                for chunk in self.detector.load_and_chunk(path):
+                    chunk_texts.append(chunk.page_content)
+                    chunk_owner.append(owner)
+
+            dense_embs, sparse_embs = self.detector.get_hybrid_embeddings_batch(chunk_texts + jd_texts)
+            n_chunks = len(chunk_texts)
+            chunk_dense, jd_dense = dense_embs[:n_chunks], dense_embs[n_chunks:]
+            chunk_sparse, jd_sparse = sparse_embs[:n_chunks], sparse_embs[n_chunks:]
+
+            scores = self.score_matrix(
+                chunk_dense, chunk_sparse, np.asarray(chunk_owner, dtype=np.int64),
+                len(resume_paths), jd_dense, jd_sparse,
+            )
+
+            top_resumes = self.top_k(scores, top_k, axis=0)
+            top_jds = self.top_k(scores, top_k, axis=1)
+
+            def entry(i, j, key, name):
+                score = float(scores[i, j])
+                return {key: name, "score": score, "match": score >= threshold}
+
+            result = {
+                "by_jd": [
+                    {
+                        "jd_index": j,
+                        "matches": [entry(i, j, "resume", resume_names[i]) for i in top_resumes[:, j]],
+                    }
+                    for j in range(len(jd_texts))
+                ],
+                "by_resume": [
+                    {
+                        "resume": resume_names[i],
+                        "matches": [entry(i, j, "jd_index", int(j)) for j in top_jds[i]],
+                    }
+                    for i in range(len(resume_paths))
+                ],
+            }
+
+            logger.info(f"Computed {scores.shape[0]}x{scores.shape[1]} resume/JD score matrix.")
+            return result
+
+        except Exception as e:
+            logger.error(f"Error matching resumes against JDs: {e}")
+            raise ResumeFraudException("Failed resume/JD matching.", sys) from e
@@ -1,20 +1,23 @@
 
 import os
+import sys
 from pinecone.grpc import PineconeGRPC as pinecone
 
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from typing import List, Dict
-from numpy import dot
-from numpy.linalg import norm
+import numpy as np
 from dotenv import load_dotenv
 from logger import logger
 from exception import ResumeFraudException
+from src.embedding_cache import EmbeddingCache, get_embedding_cache
 
 load_dotenv()
 
 class PlagiarismDetector:
-    def __init__(self, index_name="hybrid-index", namespace="resumes"):
+    def __init__(self, index_name="hybrid-index", namespace="resumes", cache: EmbeddingCache = None):
+        self.cache = cache or get_embedding_cache()
+
         try:
             api_key = os.getenv("PINECONE_API_KEY")
             logger.info("Initializing Pinecone...")
@@ -61,32 +64,25 @@ class PlagiarismDetector:
 
     
     def get_hybrid_embeddings(self,text: str):
+        dense_embs, sparse_embs = self.get_hybrid_embeddings_batch([text])
+        return dense_embs[0].tolist(), sparse_embs[0]
+
+    def get_hybrid_embeddings_batch(self, texts: List[str], batch_size: int = 96):
+        """Embed many texts, only calling Pinecone for chunks missing from the embedding cache.
+
+        Dense vectors come back stacked in one float32 array, sparse vectors as a list of dicts.
+        """
         try:
-            logger.info("Generating hybrid embeddings...")
-            dense_emb = self.pc.inference.embed(
-                model="llama-text-embed-v2",
-                inputs=text,
-                parameters={"input_type": "query", "truncate": "END"}
-            )[0]['values']
-
-            sparse_emb_raw = self.pc.inference.embed(
-                model="pinecone-sparse-english-v0",
-                inputs=text,
-                parameters={"input_type": "query", "truncate": "END"}
-            )[0]
-
-            sparse_emb = {
-                'indices': sparse_emb_raw['sparse_indices'],
-                'values': sparse_emb_raw['sparse_values']
-            }
+            logger.info(f"Generating hybrid embeddings for {len(texts)} texts...")
+            dense_embs, sparse_embs = self.cache.embed_hybrid(self.pc, texts, "query", batch_size=batch_size)
 
-            return dense_emb, sparse_emb
+            return dense_embs, sparse_embs
 
         except Exception as e:
             logger.error(f"Error generating embeddings: {e}")
-            raise ResumeFraudException("Failed to generate embeddings.") from e
+            raise ResumeFraudException("Failed to generate embeddings.", sys) from e
+
 
-   
     def check_resume_chunks(self, file_path: str, top_k: int = 1,threshold: float = 0.85) -> List[Dict]:
         try:
             chunks = self.load_and_chunk(file_path)
@@ -94,12 +90,13 @@ class PlagiarismDetector:
 
             logger.info(f"Checking plagiarism for {len(chunks)} chunks in '{file_path}' against Pinecone index.")
 
-            for chunk in chunks:
-                dense_vector, sparse_vector = self.get_hybrid_embeddings(chunk.page_content)
+            dense_vectors, sparse_vectors = self.get_hybrid_embeddings_batch([c.page_content for c in chunks])
+
+            for dense_vector, sparse_vector in zip(dense_vectors, sparse_vectors):
                 query_response = self.index.query(
                     namespace=self.namespace,
                     top_k=top_k,
-                    vector=dense_vector,
+                    vector=dense_vector.tolist(),
                     sparse_vector=sparse_vector,
                     include_values=False,
                     include_metadata=True
@@ -126,27 +123,18 @@ class PlagiarismDetector:
     def check_with_jd(self, resume_path: str, jd_text: str, threshold: float = 0.7) -> dict:
         try:
             chunks = self.load_and_chunk(resume_path)
-            total_score = 0.0
             logger.info(f"Comparing resume '{resume_path}' with its JD...")
 
-            for chunk in chunks:
-                dense_resume, sparse_resume = self.get_hybrid_embeddings(chunk.page_content)
-                dense_jd, sparse_jd = self.get_hybrid_embeddings(jd_text)
-
-                dense_score = dot(dense_resume, dense_jd) / (norm(dense_resume) * norm(dense_jd) + 1e-10)
-                
-                resume_sparse_dict = dict(zip(sparse_resume['indices'], sparse_resume['values']))
-                jd_sparse_dict = dict(zip(sparse_jd['indices'], sparse_jd['values']))
-                common_indices = set(resume_sparse_dict.keys()) & set(jd_sparse_dict.keys())
-                sparse_score = (
-                    sum(resume_sparse_dict[i] * jd_sparse_dict[i] for i in common_indices) /
-                    (sum(resume_sparse_dict.values()) + 1e-10)
-                    if common_indices else 0.0
-                )
-
-                total_score += 0.3 * dense_score + 0.7 * sparse_score
+            dense_embs, sparse_embs = self.get_hybrid_embeddings_batch([c.page_content for c in chunks] + [jd_text])
+            dense_jd, sparse_jd = dense_embs[-1], sparse_embs.pop()
+            dense_embs = dense_embs[:-1]
 
-            avg_score = total_score / len(chunks) if chunks else 0.0
+            # Imported here: jd_matcher imports this module for its default detector.
+            from src.jd_matcher import JDMatcher
+            scores = JDMatcher.score_matrix(
+                dense_embs, sparse_embs, np.zeros(len(dense_embs), dtype=np.int64), 1, [dense_jd], [sparse_jd]
+            )
+            avg_score = float(scores[0, 0])
             logger.info(f"Average similarity score between resume and JD: {avg_score:.4f}")
 
             result = {
@@ -0,0 +1,157 @@
+import hashlib
+import sqlite3
+
+import numpy as np
+import pytest
+
+from exception import ResumeFraudException
+from src import embedding_cache
+from src.embedding_cache import EmbeddingCache, get_embedding_cache
+
+
+def fake_dense(text, dim=4):
+    seed = int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16) % 2**32
+    return np.random.default_rng(seed).random(dim).astype(np.float32).tolist()
+
+
+class FakePinecone:
+    """Stands in for the Pinecone client: deterministic embeddings plus a log of embedded texts."""
+
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.embedded = []
+        self.inference = self
+
+    def embed(self, model, inputs, parameters):
+        self.embedded.extend((model, text) for text in inputs)
+        if "sparse" in model:
+            return [{'sparse_indices': [len(t), 7], 'sparse_values': [0.5, float(len(t))]} for t in inputs]
+        return [{'values': fake_dense(t, self.dim)} for t in inputs]
+
+
+def test_repeated_and_whitespace_variant_text_hits(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=10)
+    pc = FakePinecone()
+
+    dense, sparse = cache.embed_hybrid(pc, ["Python  developer", "SQL"], "query")
+    assert dense.dtype == np.float32 and dense.shape == (2, 4)
+    assert dense[0].tolist() == pytest.approx(fake_dense("Python  developer"))
+    assert sparse[1] == {'indices': [3, 7], 'values': [0.5, 3.0]}
+    assert len(pc.embedded) == 4
+
+    dense_again, _ = cache.embed_hybrid(pc, ["Python developer\n", "SQL", "SQL"], "query")
+    assert len(pc.embedded) == 4
+    np.testing.assert_array_equal(dense_again[0], dense[0])
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (6, 4)
+    assert stats["hit_rate"] == pytest.approx(0.6)
+
+
+def test_input_type_is_part_of_the_key(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    pc = FakePinecone()
+    cache.embed_hybrid(pc, ["chunk"], "passage")
+    cache.embed_hybrid(pc, ["chunk"], "query")
+    assert len(pc.embedded) == 4
+
+
+def test_evicts_least_recently_used_at_max_entries(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=3)
+    pc = FakePinecone()
+    for text in ("a", "b", "c"):
+        cache.embed_hybrid(pc, [text], "query")
+    cache.embed_hybrid(pc, ["a"], "query")  # touch "a" so "b" is the oldest
+    cache.embed_hybrid(pc, ["d"], "query")
+
+    stats = cache.stats()
+    assert stats["dense_entries"] == stats["sparse_entries"] == 3
+
+    pc.embedded.clear()
+    dense, _ = cache.embed_hybrid(pc, ["a", "c", "d", "b"], "query")
+    assert [text for _, text in pc.embedded] == ["b", "b"]
+    for row, text in zip(dense, "acdb"):
+        assert row.tolist() == pytest.approx(fake_dense(text))
+
+
+def test_reused_slot_never_returns_the_evicted_vector(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=1)
+    pc = FakePinecone()
+    cache.embed_hybrid(pc, ["old"], "query")
+    cache.embed_hybrid(pc, ["new"], "query")
+
+    key = EmbeddingCache.make_key("old", embedding_cache.DENSE_MODEL, "query")
+    assert cache._read_dense(key, 0) is None
+
+
+def test_second_instance_sees_first_instance_entries(tmp_path):
+    pc = FakePinecone()
+    first = EmbeddingCache(str(tmp_path), max_entries=5)
+    first.embed_hybrid(pc, ["shared chunk"], "query")
+
+    second = EmbeddingCache(str(tmp_path), max_entries=5)
+    pc.embedded.clear()
+    dense, sparse = second.embed_hybrid(pc, ["shared chunk"], "query")
+    assert pc.embedded == []
+    assert dense[0].tolist() == pytest.approx(fake_dense("shared chunk"))
+    assert sparse[0]['indices'] == [12, 7]
+
+
+def test_mismatched_capacity_adopts_stored_capacity(tmp_path):
+    pc = FakePinecone()
+    small = EmbeddingCache(str(tmp_path), max_entries=3)
+    small.embed_hybrid(pc, ["a", "b"], "query")
+
+    large = EmbeddingCache(str(tmp_path), max_entries=5)
+    assert large.max_entries == 3
+    large.embed_hybrid(pc, ["c"], "query")
+    small.embed_hybrid(pc, ["a"], "query")
+
+    assert large.stats()["dense_entries"] == 3
+    pc.embedded.clear()
+    large.embed_hybrid(pc, ["a", "b", "c"], "query")
+    assert pc.embedded == []
+
+
+def test_write_failure_falls_back_to_fresh_embeddings(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path))
+    pc = FakePinecone()
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache, "_store", locked)
+    dense, sparse = cache.embed_hybrid(pc, ["chunk"], "query")
+    assert dense[0].tolist() == pytest.approx(fake_dense("chunk"))
+    assert sparse[0]['indices'] == [5, 7]
+
+
+def test_dimension_mismatch_does_not_fail_the_call(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.embed_hybrid(FakePinecone(dim=4), ["a"], "query")
+    dense, _ = cache.embed_hybrid(FakePinecone(dim=6), ["b"], "query")
+    assert dense.shape == (1, 6)
+
+
+def test_empty_batch(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    dense, sparse = cache.embed_hybrid(FakePinecone(), [], "query")
+    assert dense.shape[0] == 0 and sparse == []
+
+
+def test_unusable_cache_dir_raises(tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    with pytest.raises(ResumeFraudException):
+        EmbeddingCache(str(blocker))
+
+
+def test_default_cache_is_a_singleton(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_default_cache", None)
+    monkeypatch.setenv("EMBEDDING_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("EMBEDDING_CACHE_MAX_ENTRIES", "7")
+
+    cache = get_embedding_cache()
+    assert cache is get_embedding_cache()
+    assert cache.cache_dir == str(tmp_path)
+    assert cache.max_entries == 7
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from numpy.linalg import norm
+
+from exception import ResumeFraudException
+from src.jd_matcher import JDMatcher
+
+
+def loop_score(chunk_dense, chunk_sparse, jd_dense, jd_sparse):
+    """The per-chunk loop check_with_jd used before it moved onto score_matrix."""
+    total = 0.0
+    for dense, sparse in zip(chunk_dense, chunk_sparse):
+        dense_score = np.dot(dense, jd_dense) / (norm(dense) * norm(jd_dense) + 1e-10)
+        resume_dict = dict(zip(sparse['indices'], sparse['values']))
+        jd_dict = dict(zip(jd_sparse['indices'], jd_sparse['values']))
+        common = set(resume_dict) & set(jd_dict)
+        sparse_score = (
+            sum(resume_dict[i] * jd_dict[i] for i in common) / (sum(resume_dict.values()) + 1e-10)
+            if common else 0.0
+        )
+        total += 0.3 * dense_score + 0.7 * sparse_score
+    return total / len(chunk_dense) if chunk_dense else 0.0
+
+
+def random_sparse(rng, n):
+    indices = rng.choice(2**32 - 1, size=n, replace=False)
+    return {'indices': indices.tolist(), 'values': rng.random(n).tolist()}
+
+
+def random_embeddings(rng, n, dim=16, shared=None):
+    dense = rng.normal(size=(n, dim)).tolist()
+    sparse = []
+    for _ in range(n):
+        emb = random_sparse(rng, 6)
+        if shared is not None:
+            emb['indices'][:3] = shared[:3]
+        sparse.append(emb)
+    return dense, sparse
+
+
+class FakeDetector:
+    def __init__(self, chunks, embeddings):
+        self.chunks = chunks
+        self.embeddings = embeddings
+
+    def load_and_chunk(self, path):
+        class Chunk:
+            def __init__(self, text):
+                self.page_content = text
+        return [Chunk(text) for text in self.chunks[path]]
+
+    def get_hybrid_embeddings_batch(self, texts):
+        return [self.embeddings[t][0] for t in texts], [self.embeddings[t][1] for t in texts]
+
+
+def test_score_matrix_matches_per_chunk_loop():
+    rng = np.random.default_rng(0)
+    shared = rng.choice(2**32 - 1, size=3, replace=False).tolist()
+    jd_dense, jd_sparse = random_embeddings(rng, 2, shared=shared)
+    resumes = [random_embeddings(rng, n, shared=shared) for n in (3, 1, 4)]
+
+    chunk_dense = [d for dense, _ in resumes for d in dense]
+    chunk_sparse = [s for _, sparse in resumes for s in sparse]
+    owner = np.repeat(np.arange(len(resumes)), [len(dense) for dense, _ in resumes])
+
+    scores = JDMatcher.score_matrix(chunk_dense, chunk_sparse, owner, len(resumes), jd_dense, jd_sparse)
+
+    assert scores.shape == (3, 2)
+    for i, (dense, sparse) in enumerate(resumes):
+        for j in range(2):
+            assert scores[i, j] == pytest.approx(loop_score(dense, sparse, jd_dense[j], jd_sparse[j]), abs=1e-6)
+
+
+def test_score_matrix_resume_without_chunks_scores_zero():
+    rng = np.random.default_rng(1)
+    jd_dense, jd_sparse = random_embeddings(rng, 1)
+    chunk_dense, chunk_sparse = random_embeddings(rng, 2)
+
+    scores = JDMatcher.score_matrix(chunk_dense, chunk_sparse, np.array([0, 2]), 3, jd_dense, jd_sparse)
+    assert scores.shape == (3, 1)
+    assert scores[1, 0] == 0.0
+
+    empty = JDMatcher.score_matrix([], [], np.array([], dtype=np.int64), 2, jd_dense, jd_sparse)
+    assert empty.shape == (2, 1)
+    assert not empty.any()
+
+
+def test_sparse_matrices_sum_duplicate_indices():
+    chunk, jd = JDMatcher._sparse_matrices(
+        [{'indices': [5, 5, 2**32 - 1], 'values': [0.25, 0.5, 1.0]}],
+        [{'indices': [5], 'values': [2.0]}],
+    )
+    assert chunk.shape == jd.shape == (1, 2)
+    assert chunk.toarray().tolist() == [[0.75, 1.0]]
+    assert (chunk @ jd.T).toarray()[0, 0] == pytest.approx(1.5)
+
+
+def test_top_k_sorted_and_clamped():
+    scores = np.array([[0.1, 0.9, 0.5], [0.7, 0.2, 0.3]])
+    assert JDMatcher.top_k(scores, 2, axis=1).tolist() == [[1, 2], [0, 2]]
+    assert JDMatcher.top_k(scores, 10, axis=0).tolist() == [[1, 0, 0], [0, 1, 1]]
+
+
+def test_match_ranks_both_directions():
+    rng = np.random.default_rng(2)
+    embeddings = {}
+    for text in ("a1", "a2", "b1", "jd0", "jd1"):
+        dense, sparse = random_embeddings(rng, 1)
+        embeddings[text] = (dense[0], sparse[0])
+    # Resume b is the JD itself, so it should rank first for jd1.
+    embeddings["b1"] = embeddings["jd1"]
+
+    matcher = JDMatcher(detector=FakeDetector({"a": ["a1", "a2"], "b": ["b1"]}, embeddings))
+    result = matcher.match(["a", "b"], ["jd0", "jd1"], top_k=1)
+
+    assert [m["resume"] for m in result["by_jd"][1]["matches"]] == ["b"]
+    assert [m["jd_index"] for m in result["by_resume"][1]["matches"]] == [1]
+    assert result["by_resume"][1]["matches"][0]["match"]
+
+
+def test_match_rejects_non_positive_top_k():
+    matcher = JDMatcher(detector=FakeDetector({}, {}))
+    with pytest.raises(ValueError):
+        matcher.match(["a"], ["jd"], top_k=0)
+
+
+def test_match_wraps_failures():
+    matcher = JDMatcher(detector=FakeDetector({}, {}))
+    with pytest.raises(ResumeFraudException):
+        matcher.match(["missing"], ["jd"])